@@ -1,15 +1,14 @@
 import sys, time
-from PyQt5.QtCore import Qt, QTimer, QTime, QDateTime
+from PyQt5.QtCore import (Qt, QTimer, QTime, QDateTime, QFileSystemWatcher,
+                          QThread, QMutex, QWaitCondition, pyqtSignal)
+from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout
-import threading, time
 
 import socket
-import fcntl
-import struct
-import subprocess
 import csv
 import random
 import os
+import collections
 
 RUN_ON_PI = True
 
@@ -20,12 +19,24 @@ else:
     CLOCK_FONT_SIZE = 300
     FOOTER_FONT_SIZE = 50
 
+# Data files live next to the script, wherever it is launched from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MESSAGE_PATH = os.path.join(BASE_DIR, "message.txt")
+CHARACTERS_PATH = os.path.join(BASE_DIR, "input.csv")
+
+# Socket reused for every SIOCGIFADDR lookup on the Pi
+_wlan_sock = None
+
 def get_wlan_ipaddress():
+    global _wlan_sock
+    import fcntl
+    import struct
     # Get the network interface associated with WiFi
     ifname = 'wlan0'  # This assumes your WiFi interface is named 'wlan0'
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if _wlan_sock is None:
+        _wlan_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     ip_address = socket.inet_ntoa(fcntl.ioctl(
-        sock.fileno(),
+        _wlan_sock.fileno(),
         0x8915,  # SIOCGIFADDR
         struct.pack('256s', ifname[:15].encode('utf-8'))
     )[20:24])
@@ -33,21 +44,113 @@ def get_wlan_ipaddress():
 
 # macOS
 def get_en0_ipaddress():
+    # Look the address up in-process when netifaces is available and only
+    # fall back to forking ipconfig without it
+    try:
+        import netifaces
+        return netifaces.ifaddresses('en0')[netifaces.AF_INET][0]['addr']
+    except (ImportError, KeyError, ValueError):
+        pass
+    import subprocess
     ip_address = subprocess.check_output(['ipconfig', 'getifaddr', 'en0']).decode().strip()
     return ip_address
 
+class MessageWorker(QThread):
+    # Reads the first line of message.txt off the GUI thread each time
+    # wake() is called and hands it back through the msg signal
+    msg = pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.mutex = QMutex()
+        self.condition = QWaitCondition()
+        self.pending = True  # read the message once at startup
+        self.stopping = False
+
+    def wake(self):
+        self.mutex.lock()
+        self.pending = True
+        self.condition.wakeOne()
+        self.mutex.unlock()
+
+    def stop(self):
+        self.mutex.lock()
+        self.stopping = True
+        self.condition.wakeOne()
+        self.mutex.unlock()
+        self.wait()
+
+    def run(self):
+        while True:
+            self.mutex.lock()
+            while not self.pending and not self.stopping:
+                self.condition.wait(self.mutex)
+            stopping = self.stopping
+            self.pending = False
+            self.mutex.unlock()
+            if stopping:
+                return
+            # The message is a single short line, so skip the text-mode io
+            # stack and read a small raw buffer straight from the fd
+            # If the file is missing (e.g. mid-rewrite), keep the last message
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+                try:
+                    data = os.read(fd, 4096)
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue
+            self.msg.emit(data.decode("utf-8", "replace").split("\n", 1)[0].strip())
+
+class CharacterLoader(QThread):
+    # Parses input.csv off the GUI thread and hands back the frame and
+    # character columns as two parallel tuples
+    loaded = pyqtSignal(tuple, tuple)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        # Stream the rows, keeping only the two columns the display uses.
+        # Rows without both columns are skipped, and if the file can't be
+        # read, whatever was parsed up to that point is still handed back
+        frames = []
+        characters = []
+        try:
+            with open(self.path, "r", encoding="utf-8",
+                      newline="", buffering=65536) as f:
+                for row in csv.reader(f):
+                    if len(row) < 2:
+                        continue
+                    frames.append(row[0])
+                    characters.append(row[1])
+        except (OSError, UnicodeDecodeError, csv.Error):
+            pass
+        self.loaded.emit(tuple(frames), tuple(characters))
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
-        self.callback_done = threading.Event()
-        self.characters = []
-        self.read_csv_chars()
+        self.last_message = None
+        self.frames = ()
+        self.characters = ()
+        self.deck = collections.deque()
         self.initUI()
-        self.update_character()
+        self.load_characters()
+        self.watch_message_file()
 
 
     def initUI(self):
 
+        # Build the fonts once and share them between the labels
+        self.clock_font = QFont()
+        self.clock_font.setPointSize(CLOCK_FONT_SIZE)
+        self.footer_font = QFont()
+        self.footer_font.setPointSize(FOOTER_FONT_SIZE)
+
         self.createHeaderLabel()
         self.createcharacter_label()
         self.createIPAddressLabel()
@@ -67,35 +170,48 @@ class MainWindow(QWidget):
         layout.addLayout(footer_layout)  
         self.setLayout(layout)
 
-        # center the widget on the screen
-        qr = self.frameGeometry()
-        cp = QApplication.desktop().screenGeometry().center()
-        qr.moveCenter(cp)
-        self.move(qr.topLeft())
-
+        # No need to centre the window first: showFullScreen places it
         self.showFullScreen()
-        self.setStyleSheet("background-color: black;")
+        # All colours live in one stylesheet, parsed once for the whole window
+        self.setStyleSheet("""
+            QWidget { background-color: black; }
+            QLabel#header { color: lightblue; }
+            QLabel#character { color: white; }
+            QLabel#ip { color: pink; }
+            QLabel#frame { color: green; }
+        """)
         self.setCursor(Qt.BlankCursor)
 
-    def read_csv_chars(self):
-        dirname = os.path.dirname(__file__) or '.'
-        f = open(dirname + "/" +  "input.csv", "r")
-        csv_reader = csv.reader(f)
-        for row in csv_reader:
-            tup = (row[0], row[1])
-            self.characters.append(tup)
-        f.close()
+    def load_characters(self):
+        # Parse input.csv in the background and show the first character
+        # once the rows arrive
+        self.character_loader = CharacterLoader(CHARACTERS_PATH, self)
+        self.character_loader.loaded.connect(self.set_characters, Qt.QueuedConnection)
+        self.character_loader.start()
+
+    def set_characters(self, frames, characters):
+        self.frames = frames
+        self.characters = characters
+        self.deck.clear()
+        self.update_character()
+
+    def shuffle_deck(self):
+        # Deal every character once in random order before repeating any
+        indexes = list(range(len(self.characters)))
+        random.shuffle(indexes)
+        self.deck.extend(indexes)
 
     def createcharacter_label(self):
         self.character_label = QLabel('', self)
         self.character_label.setAlignment(Qt.AlignCenter)
-        font = self.character_label.font()
-        font.setPointSize(CLOCK_FONT_SIZE)
-        self.character_label.setFont(font)
-        self.character_label.setStyleSheet('color: white')
+        self.character_label.setFont(self.clock_font)
+        self.character_label.setObjectName('character')
 
-        # Create a timer that updates the clock every second
+        # Create a timer that shows the next character every 10 seconds.
+        # Second-level accuracy is plenty, so let Qt coalesce the wakeup
+        # with other timers instead of scheduling a precise one
         self.timer = QTimer()
+        self.timer.setTimerType(Qt.VeryCoarseTimer)
         self.timer.timeout.connect(self.update_character)
         self.timer.start(10000)
 
@@ -103,14 +219,11 @@ class MainWindow(QWidget):
     def createHeaderLabel(self):
         self.header_label = QLabel(self)
         self.header_label.setText("There are no bad pictures - thats just how your face looks sometimes")
-        self.header_label.setStyleSheet('color: lightblue')
+        self.header_label.setObjectName('header')
         self.header_label.setWordWrap(True)
         self.header_label.setAlignment(Qt.AlignCenter)
         self.header_label.resize(100, 20)
-
-        font = self.header_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.header_label.setFont(font)
+        self.header_label.setFont(self.footer_font)
 
     def createIPAddressLabel(self):
         self.ip_label = QLabel(self)
@@ -119,37 +232,60 @@ class MainWindow(QWidget):
         else:
             ip_address = get_en0_ipaddress()
         self.ip_label.setText(ip_address)
-        self.ip_label.setStyleSheet('color: pink')
-        font = self.ip_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.ip_label.setFont(font)
+        self.ip_label.setObjectName('ip')
+        self.ip_label.setFont(self.footer_font)
 
     def createFrameLabel(self):
         self.frame_label = QLabel("...",self)
-        self.frame_label.setStyleSheet('color: green')
-        font = self.frame_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.frame_label.setFont(font)
+        self.frame_label.setObjectName('frame')
+        self.frame_label.setFont(self.footer_font)
         self.end_time = QDateTime(2024, 9, 15, 9, 0)  # May 11th 2023, 7pm
 
     def update_character(self):
-
-        # Check for discord message
-        self.checkForMessage()
+        if not self.characters:
+            return
 
         # Choose next character
-        self.index = random.randrange(len(self.characters))
-        current_character = self.characters[self.index][1]
-        current_frame = self.characters[self.index][0]
-        self.character_label.setText(current_character)
-        self.frame_label.setText(current_frame)
+        if not self.deck:
+            self.shuffle_deck()
+        self.index = self.deck.popleft()
+        self.character_label.setText(self.characters[self.index])
+        self.frame_label.setText(self.frames[self.index])
+
+    def watch_message_file(self):
+        # Only re-read the discord message when message.txt changes
+        self.message_path = MESSAGE_PATH
+        self.message_worker = MessageWorker(self.message_path, self)
+        self.message_worker.msg.connect(self.set_message, Qt.QueuedConnection)
+        self.message_worker.start()
+        QApplication.instance().aboutToQuit.connect(self.message_worker.stop)
+
+        # Also watch the directory so the file can be picked up again after
+        # it has been deleted and recreated
+        self.message_watcher = QFileSystemWatcher([self.message_path, BASE_DIR], self)
+        self.message_watcher.fileChanged.connect(self.checkForMessage)
+        self.message_watcher.directoryChanged.connect(self.rewatch_message_file)
 
     def checkForMessage(self):
-        dirname = os.path.dirname(__file__) or '.'
-        f = open(dirname + "/" +  "message.txt", "r")
-        message = f.readline()
-        self.header_label.setText(message)
-        f.close()
+        # The watcher drops the path when the file is removed or replaced.
+        # Re-add it if it is back; if it is still missing, keep the last
+        # message and wait for rewatch_message_file
+        if self.message_path not in self.message_watcher.files():
+            if not self.message_watcher.addPath(self.message_path):
+                return
+        self.message_worker.wake()
+
+    def rewatch_message_file(self):
+        # Something in the directory changed; only act if message.txt had
+        # dropped out of the watcher
+        if self.message_path not in self.message_watcher.files():
+            self.checkForMessage()
+
+    def set_message(self, message):
+        # Skip the relayout when the file changed but the message did not
+        if message != self.last_message:
+            self.header_label.setText(message)
+            self.last_message = message
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
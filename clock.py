@@ -1,12 +1,11 @@
 import sys, time
-from PyQt5.QtCore import Qt, QTimer, QTime, QDateTime
+from PyQt5.QtCore import (Qt, QTimer, QTime, QDateTime, QFileSystemWatcher,
+                          QThread, QMutex, QWaitCondition, pyqtSignal)
+from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout
-import threading, time
 
 import socket
-import fcntl
-import struct
-import subprocess
+import os
 
 RUN_ON_PI = False
 
@@ -17,12 +16,23 @@ else:
     CLOCK_FONT_SIZE = 300
     FOOTER_FONT_SIZE = 50
 
+# Data files live next to the script, wherever it is launched from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MESSAGE_PATH = os.path.join(BASE_DIR, "message.txt")
+
+# Socket reused for every SIOCGIFADDR lookup on the Pi
+_wlan_sock = None
+
 def get_wlan_ipaddress():
+    global _wlan_sock
+    import fcntl
+    import struct
     # Get the network interface associated with WiFi
     ifname = 'wlan0'  # This assumes your WiFi interface is named 'wlan0'
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if _wlan_sock is None:
+        _wlan_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     ip_address = socket.inet_ntoa(fcntl.ioctl(
-        sock.fileno(),
+        _wlan_sock.fileno(),
         0x8915,  # SIOCGIFADDR
         struct.pack('256s', ifname[:15].encode('utf-8'))
     )[20:24])
@@ -30,17 +40,86 @@ def get_wlan_ipaddress():
 
 # macOS
 def get_en0_ipaddress():
+    # Look the address up in-process when netifaces is available and only
+    # fall back to forking ipconfig without it
+    try:
+        import netifaces
+        return netifaces.ifaddresses('en0')[netifaces.AF_INET][0]['addr']
+    except (ImportError, KeyError, ValueError):
+        pass
+    import subprocess
     ip_address = subprocess.check_output(['ipconfig', 'getifaddr', 'en0']).decode().strip()
     return ip_address
 
+def msecs_to_next_second():
+    return 1000 - QDateTime.currentMSecsSinceEpoch() % 1000
+
+class MessageWorker(QThread):
+    # Reads the first line of message.txt off the GUI thread each time
+    # wake() is called and hands it back through the msg signal
+    msg = pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.mutex = QMutex()
+        self.condition = QWaitCondition()
+        self.pending = True  # read the message once at startup
+        self.stopping = False
+
+    def wake(self):
+        self.mutex.lock()
+        self.pending = True
+        self.condition.wakeOne()
+        self.mutex.unlock()
+
+    def stop(self):
+        self.mutex.lock()
+        self.stopping = True
+        self.condition.wakeOne()
+        self.mutex.unlock()
+        self.wait()
+
+    def run(self):
+        while True:
+            self.mutex.lock()
+            while not self.pending and not self.stopping:
+                self.condition.wait(self.mutex)
+            stopping = self.stopping
+            self.pending = False
+            self.mutex.unlock()
+            if stopping:
+                return
+            # The message is a single short line, so skip the text-mode io
+            # stack and read a small raw buffer straight from the fd
+            # If the file is missing (e.g. mid-rewrite), keep the last message
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+                try:
+                    data = os.read(fd, 4096)
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue
+            self.msg.emit(data.decode("utf-8", "replace").split("\n", 1)[0].strip())
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
-        self.callback_done = threading.Event()
+        self.last_message = None
+        self.last_clock_text = None
+        self.last_countdown_text = None
         self.initUI()
+        self.watch_message_file()
 
     def initUI(self):
 
+        # Build the fonts once and share them between the labels
+        self.clock_font = QFont()
+        self.clock_font.setPointSize(CLOCK_FONT_SIZE)
+        self.footer_font = QFont()
+        self.footer_font.setPointSize(FOOTER_FONT_SIZE)
+
         self.createHeaderLabel()
         self.createClockLabel()
         self.createIPAddressLabel()
@@ -60,41 +139,42 @@ class MainWindow(QWidget):
         layout.addLayout(footer_layout)  
         self.setLayout(layout)
 
-        # center the widget on the screen
-        qr = self.frameGeometry()
-        cp = QApplication.desktop().screenGeometry().center()
-        qr.moveCenter(cp)
-        self.move(qr.topLeft())
-
+        # No need to centre the window first: showFullScreen places it
         self.showFullScreen()
-        self.setStyleSheet("background-color: black;")
+        # All colours live in one stylesheet, parsed once for the whole window
+        self.setStyleSheet("""
+            QWidget { background-color: black; }
+            QLabel#header { color: lightblue; }
+            QLabel#clock { color: white; }
+            QLabel#ip { color: pink; }
+            QLabel#countdown { color: green; }
+        """)
         self.setCursor(Qt.BlankCursor)
 
     def createClockLabel(self):
         self.clockLabel = QLabel('', self)
         self.clockLabel.setAlignment(Qt.AlignCenter)
-        font = self.clockLabel.font()
-        font.setPointSize(CLOCK_FONT_SIZE)
-        self.clockLabel.setFont(font)
-        self.clockLabel.setStyleSheet('color: white')
+        self.clockLabel.setFont(self.clock_font)
+        self.clockLabel.setObjectName('clock')
 
-        # Create a timer that updates the clock every second
+        # Create a timer that updates the clock on every second boundary.
+        # It is single shot and re-armed from update_clock against the wall
+        # clock, so the ticks never drift away from the boundary
         self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.update_clock)
-        self.timer.start(1000)
+        self.timer.start(msecs_to_next_second())
 
 
     def createHeaderLabel(self):
         self.header_label = QLabel(self)
         self.header_label.setText("There are no bad pictures - thats just how your face looks sometimes")
-        self.header_label.setStyleSheet('color: lightblue')
+        self.header_label.setObjectName('header')
         self.header_label.setWordWrap(True)
         self.header_label.setAlignment(Qt.AlignCenter)
         self.header_label.resize(100, 20)
-
-        font = self.header_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.header_label.setFont(font)
+        self.header_label.setFont(self.footer_font)
 
     def createIPAddressLabel(self):
         self.ip_label = QLabel(self)
@@ -103,47 +183,79 @@ class MainWindow(QWidget):
         else:
             ip_address = get_en0_ipaddress()
         self.ip_label.setText(ip_address)
-        self.ip_label.setStyleSheet('color: pink')
-        font = self.ip_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.ip_label.setFont(font)
+        self.ip_label.setObjectName('ip')
+        self.ip_label.setFont(self.footer_font)
 
     def createCountDownLabel(self):
         self.countdown_label = QLabel("...",self)
-        self.countdown_label.setStyleSheet('color: green')
-        font = self.countdown_label.font() # get the current font
-        font.setPointSize(FOOTER_FONT_SIZE)
-        self.countdown_label.setFont(font)
+        self.countdown_label.setObjectName('countdown')
+        self.countdown_label.setFont(self.footer_font)
         self.end_time = QDateTime(2023, 9, 15, 9, 0)  # May 11th 2023, 7pm
 
     def update_clock(self):
+        self.timer.start(msecs_to_next_second())
+
         # Get the current time and display it on the label
         current_clock_time = QTime.currentTime()
         current_time_text = current_clock_time.toString("hh:mm:ss")
-        self.clockLabel.setText(current_time_text)
-
-        # Check for discord message
-        self.checkForMessage()
+        if current_time_text != self.last_clock_text:
+            self.clockLabel.setText(current_time_text)
+            self.last_clock_text = current_time_text
 
         # Update countdown timere
         current_date_time = QDateTime.currentDateTime()
         time_left = current_date_time.secsTo(self.end_time)
 
         if time_left <= 0:
-            self.countdown_label.setText("Countdown over!")
+            countdown_text = "Countdown over!"
         else:
-            days_left = time_left // (24 * 60 * 60)
-            time_left -= days_left * 24 * 60 * 60
-            time = QTime(0, 0, 0).addSecs(time_left)
+            days_left, time_left = divmod(time_left, 24 * 60 * 60)
+            hours_left, time_left = divmod(time_left, 60 * 60)
+            mins_left, secs_left = divmod(time_left, 60)
+
+            countdown_text = "{} days,  {:02d} hrs,  {:02d} mins,  {:02d} secs".format(
+                days_left, hours_left, mins_left, secs_left)
 
-            self.countdown_label.setText("{} days,  {} hrs,  {} mins,  {} secs".format(
-                days_left, time.toString('hh'), time.toString('mm'), time.toString('ss')))
+        # Only touch the label when the text changes, e.g. not every second
+        # once the countdown is over
+        if countdown_text != self.last_countdown_text:
+            self.countdown_label.setText(countdown_text)
+            self.last_countdown_text = countdown_text
+
+    def watch_message_file(self):
+        # Only re-read the discord message when message.txt changes
+        self.message_path = MESSAGE_PATH
+        self.message_worker = MessageWorker(self.message_path, self)
+        self.message_worker.msg.connect(self.set_message, Qt.QueuedConnection)
+        self.message_worker.start()
+        QApplication.instance().aboutToQuit.connect(self.message_worker.stop)
+
+        # Also watch the directory so the file can be picked up again after
+        # it has been deleted and recreated
+        self.message_watcher = QFileSystemWatcher([self.message_path, BASE_DIR], self)
+        self.message_watcher.fileChanged.connect(self.checkForMessage)
+        self.message_watcher.directoryChanged.connect(self.rewatch_message_file)
 
     def checkForMessage(self):
-        f = open("message.txt", "r")
-        message = f.readline()
-        self.header_label.setText(message)
-        f.close()
+        # The watcher drops the path when the file is removed or replaced.
+        # Re-add it if it is back; if it is still missing, keep the last
+        # message and wait for rewatch_message_file
+        if self.message_path not in self.message_watcher.files():
+            if not self.message_watcher.addPath(self.message_path):
+                return
+        self.message_worker.wake()
+
+    def rewatch_message_file(self):
+        # Something in the directory changed; only act if message.txt had
+        # dropped out of the watcher
+        if self.message_path not in self.message_watcher.files():
+            self.checkForMessage()
+
+    def set_message(self, message):
+        # Skip the relayout when the file changed but the message did not
+        if message != self.last_message:
+            self.header_label.setText(message)
+            self.last_message = message
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
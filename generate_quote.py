@@ -1,6 +1,13 @@
 import requests
 
+try:
+    import orjson as json
+except ImportError:
+    import json
+
 today = requests.get("https://zenquotes.io/api/today")
-quote = today.json()[0]['q']
-author = today.json()[0]['a']
+# Parse the response once, straight from the raw bytes
+quote_data = json.loads(today.content)[0]
+quote = quote_data['q']
+author = quote_data['a']
 print(quote + " (" + author + ")")
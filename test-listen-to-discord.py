@@ -1,7 +1,53 @@
+import asyncio
+import atexit
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import discord
 import discord_config
 
 
+# message.txt sits next to the kiosk scripts, which read it from there
+MESSAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "message.txt")
+
+# Single writer thread, so message.txt updates land in the order received.
+# It keeps one descriptor open rather than reopening the file per message
+message_writer = ThreadPoolExecutor(max_workers=1)
+msg_fd = None
+
+def close_message_file():
+    global msg_fd
+    if msg_fd is not None:
+        os.close(msg_fd)
+        msg_fd = None
+
+def write_message(text):
+    global msg_fd
+    # message.txt is tracked in git, so a pull/checkout/stash can replace
+    # it with a new file. Reopen whenever the path no longer points at the
+    # file we hold, otherwise messages would go to an orphaned inode
+    try:
+        st = os.stat(MESSAGE_PATH)
+        current = (st.st_dev, st.st_ino)
+    except FileNotFoundError:
+        current = None
+    if msg_fd is not None:
+        st = os.fstat(msg_fd)
+        if current != (st.st_dev, st.st_ino):
+            close_message_file()
+    if msg_fd is None:
+        msg_fd = os.open(MESSAGE_PATH, os.O_WRONLY | os.O_CREAT, 0o644)
+
+    # Overwrite with the new line before trimming the old tail. The kiosks
+    # only read the first line, so mid-update they still see the new
+    # message rather than an empty file
+    data = text.encode('utf-8') + b'\n'
+    os.pwrite(msg_fd, data, 0)
+    os.ftruncate(msg_fd, len(data))
+
+atexit.register(close_message_file)
+
+
 intents = discord.Intents.default()
 intents.message_content = True
 client = discord.Client(intents=intents)
@@ -20,8 +66,8 @@ async def on_message(message):
         return
 
     print('Message from {0.author}: {0.content}'.format(message))
-    f = open("message.txt", "w")
-    f.write(message.content.strip())
-    f.close()
+    # Write off the event loop so a slow SD card can't stall the client
+    await asyncio.get_running_loop().run_in_executor(
+        message_writer, write_message, message.content.strip())
 
 client.run(discord_config.house_bot_token)